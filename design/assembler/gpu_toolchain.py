@@ -30,12 +30,21 @@ Usage examples:
 import argparse, re, sys
 from pathlib import Path
 
-from isa        import encode, decode, disasm, OPCODES, DTYPE_ENC, HALT_WORD
+from isa        import (encode, decode, disasm, Instr, OPCODES, DTYPE_ENC,
+                        MN_TO_OP, HALT_WORD, OP_VADD, OP_VSUB, OP_VMUL,
+                        OP_FMAC, OP_RELU, OP_LD, OP_ST, OP_HALT)
 from assembler  import assemble, write_outputs, write_mem, write_listing
 from ptx_parser import PTXParser
 from simulator  import (GPUSim, pack_i16, pack_bf16, unpack_i16, unpack_bf16,
                         bf16_lanes_to_floats, _float_to_bf16, _bf16_to_float)
 
+# BF16 constants used by the self-tests and demo, converted and packed once
+# at import — the float→bf16 decomposition is pure Python and all uses
+# broadcast the same value to all four lanes.
+_PACK_BF1 = pack_bf16([_float_to_bf16(1.0)] * 4)
+_PACK_BF2 = pack_bf16([_float_to_bf16(2.0)] * 4)
+_PACK_BF3 = pack_bf16([_float_to_bf16(3.0)] * 4)
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Hand-written GPU assembly parser
@@ -49,31 +58,59 @@ from simulator  import (GPUSim, pack_i16, pack_bf16, unpack_i16, unpack_bf16,
 #   ST    [rs1], rs2
 #   HALT
 # ─────────────────────────────────────────────────────────────────────────────
+# Operand patterns, compiled once. The mnemonic is always the first token,
+# so each line is split once and dispatched to the single matching pattern
+# instead of re-trying every instruction regex.
+# The grammar is ASCII-only, so the line is lowercased once and the patterns
+# stay case-sensitive — cheaper than re.I's per-character case folding.
+_ASM_LD_RE  = re.compile(r'r(\d+)\s*,\s*\[\s*r(\d+)\s*\]')
+_ASM_ST_RE  = re.compile(r'\[\s*r(\d+)\s*\]\s*,\s*r(\d+)')
+_ASM_RR_RE  = re.compile(r'r(\d+)\s*,\s*r(\d+)')
+_ASM_RRR_RE = re.compile(r'r(\d+)\s*,\s*r(\d+)\s*,\s*r(\d+)')
+
+def _asm_halt(mn, rest):
+    return Instr(OP_HALT)
+
+def _asm_ld(mn, rest):
+    m = _ASM_LD_RE.match(rest)
+    if not m: return None
+    return Instr(OP_LD, rd=int(m.group(1)), rs1=int(m.group(2)))
+
+def _asm_st(mn, rest):
+    m = _ASM_ST_RE.match(rest)
+    if not m: return None
+    return Instr(OP_ST, rs1=int(m.group(1)), rs2=int(m.group(2)))
+
+def _asm_relu(mn, rest):
+    m = _ASM_RR_RE.match(rest)
+    if not m: return None
+    return Instr(OP_RELU, rd=int(m.group(1)), rs1=int(m.group(2)))
+
+def _asm_rrr(mn, rest):
+    m = _ASM_RRR_RE.match(rest)
+    if not m: return None
+    return Instr(MN_TO_OP[mn], rd=int(m.group(1)),
+                 rs1=int(m.group(2)), rs2=int(m.group(3)))
+
+_ASM_HANDLERS = {
+    "HALT": _asm_halt, "LD": _asm_ld, "ST": _asm_st, "RELU": _asm_relu,
+    "VADD": _asm_rrr, "VSUB": _asm_rrr, "VMUL": _asm_rrr, "FMAC": _asm_rrr,
+}
+
 def parse_asm(text):
     instructions = []
     for lineno, raw in enumerate(text.splitlines(), 1):
-        line = re.sub(r'[#;].*', '', raw).strip()
+        # Comments start at '#' or ';' — partition beats a regex sub here.
+        line = raw.partition('#')[0].partition(';')[0].strip().lower()
         if not line: continue
 
-        if re.match(r'HALT\b', line, re.I):
-            instructions.append({"op":"HALT","rd":0,"rs1":0,"rs2":0}); continue
-
-        m = re.match(r'LD\s+r(\d+)\s*,\s*\[\s*r(\d+)\s*\]', line, re.I)
-        if m:
-            instructions.append({"op":"LD","rd":int(m.group(1)),"rs1":int(m.group(2)),"rs2":0}); continue
-
-        m = re.match(r'ST\s+\[\s*r(\d+)\s*\]\s*,\s*r(\d+)', line, re.I)
-        if m:
-            instructions.append({"op":"ST","rd":0,"rs1":int(m.group(1)),"rs2":int(m.group(2))}); continue
-
-        m = re.match(r'RELU\s+r(\d+)\s*,\s*r(\d+)', line, re.I)
-        if m:
-            instructions.append({"op":"RELU","rd":int(m.group(1)),"rs1":int(m.group(2)),"rs2":0}); continue
-
-        m = re.match(r'(\w+)\s+r(\d+)\s*,\s*r(\d+)\s*,\s*r(\d+)', line, re.I)
-        if m:
-            instructions.append({"op":m.group(1).upper(),"rd":int(m.group(2)),
-                                  "rs1":int(m.group(3)),"rs2":int(m.group(4))}); continue
+        parts   = line.split(None, 1)
+        mn      = parts[0].upper()
+        rest    = parts[1] if len(parts) > 1 else ''
+        handler = _ASM_HANDLERS.get(mn)
+        ins     = handler(mn, rest) if handler else None
+        if ins is not None:
+            instructions.append(ins); continue
 
         print(f"  [ASM line {lineno}] unrecognised: {line}", file=sys.stderr)
     return instructions
@@ -83,24 +120,22 @@ def parse_asm(text):
 # Self-test suite  (all 5 kernel types + encode/PTX/assembler/mem file)
 # ─────────────────────────────────────────────────────────────────────────────
 def run_tests():
-    BF = _float_to_bf16
     ok = fail = 0
+    out = []   # buffered report lines — one stdout write at the end, not one syscall per line
 
     def check(name, got, exp):
         nonlocal ok, fail
         if got == exp:
-            print(f"  PASS  {name}"); ok += 1
+            out.append(f"  PASS  {name}"); ok += 1
         else:
-            print(f"  FAIL  {name}"); print(f"         got: {got!r}"); print(f"         exp: {exp!r}"); fail += 1
+            out.append(f"  FAIL  {name}"); out.append(f"         got: {got!r}"); out.append(f"         exp: {exp!r}"); fail += 1
 
-    print("\n[1] Encode / decode round-trip")
+    out.append("\n[1] Encode / decode round-trip")
     for mn,(oc,dt) in OPCODES.items():
         w = encode(oc, DTYPE_ENC[dt], 5, 3, 7)
-        d = decode(w)
-        check(f"{mn:5s} 0x{w:08X}", (d["opcode"],d["dtype"],d["rd"],d["rs1"],d["rs2"]),
-              (oc,DTYPE_ENC[dt],5,3,7))
+        check(f"{mn:5s} 0x{w:08X}", decode(w), (oc,DTYPE_ENC[dt],5,3,7))
 
-    print("\n[2] Disassembly")
+    out.append("\n[2] Disassembly")
     check("VADD",  disasm(encode(0,0,2,0,1)),  "VADD     r2, r0, r1")
     check("VSUB",  disasm(encode(1,0,2,0,1)),  "VSUB     r2, r0, r1")
     check("VMUL",  disasm(encode(2,1,2,0,1)),  "VMUL     r2, r0, r1")
@@ -110,7 +145,7 @@ def run_tests():
     check("ST",    disasm(encode(6,0,0,0,3)),  "ST       [r0], r3")
     check("HALT",  disasm(HALT_WORD),           "HALT")
 
-    print("\n[3] PTX parser")
+    out.append("\n[3] PTX parser")
     p = PTXParser(verbose=False)
     for ptx,exp_op in [("add.s16 %r2,%r0,%r1;\nret;","VADD"),
                        ("sub.s16 %r2,%r0,%r1;\nret;","VSUB"),
@@ -120,91 +155,89 @@ def run_tests():
                        ("ld.global.u64 %rd1,[%rd0];\nret;","LD"),
                        ("st.global.u64 [%rd0],%rd2;\nret;","ST")]:
         ins = p.parse(ptx)
-        check(f"PTX→{exp_op}", ins[0]["op"], exp_op)
+        check(f"PTX→{exp_op}", ins[0].op, MN_TO_OP[exp_op])
 
-    print("\n[4] Assembler encoding")
-    w = assemble([{"op":"VADD","rd":2,"rs1":0,"rs2":1}])[0]
+    out.append("\n[4] Assembler encoding")
+    w = assemble([Instr(OP_VADD, 2, 0, 1)])[0]
     check("VADD word", w, encode(0,0,2,0,1))
-    w = assemble([{"op":"FMAC","rd":3,"rs1":1,"rs2":2}])[0]
+    w = assemble([Instr(OP_FMAC, 3, 1, 2)])[0]
     check("FMAC word", w, encode(3,1,3,1,2))
-    w = assemble([{"op":"LD","rd":1,"rs1":0,"rs2":0}])[0]
+    w = assemble([Instr(OP_LD, 1, 0, 0)])[0]
     check("LD word",   w, encode(5,0,1,0,0))
-    w = assemble([{"op":"ST","rd":0,"rs1":0,"rs2":3}])[0]
+    w = assemble([Instr(OP_ST, 0, 0, 3)])[0]
     check("ST word",   w, encode(6,0,0,0,3))
 
-    print("\n[5] .mem file format")
-    import tempfile, os
-    prog = assemble([{"op":"VADD","rd":2,"rs1":0,"rs2":1},{"op":"HALT","rd":0,"rs1":0,"rs2":0}])
-    tf = tempfile.NamedTemporaryFile(mode='w', suffix='.mem', delete=False)
-    tf.close()
-    write_mem(prog, tf.name)
-    lines = open(tf.name).read().splitlines()
-    os.unlink(tf.name)
+    out.append("\n[5] .mem file format")
+    import io
+    prog = assemble([Instr(OP_VADD, 2, 0, 1), Instr(OP_HALT)])
+    buf = io.StringIO()
+    write_mem(prog, buf)
+    lines = buf.getvalue().splitlines()
     check("256 lines",          len(lines), 256)
     check("line[0]=VADD word",  lines[0],   f"{prog[0]:08X}")
     check("line[1]=HALT",       lines[1],   f"{HALT_WORD:08X}")
     check("line[255]=HALT pad", lines[255], f"{HALT_WORD:08X}")
 
-    print("\n[6] Simulator: VADD int16  [1,2,3,4]+[10,20,30,40]=[11,22,33,44]")
-    prog = assemble([{"op":"VADD","rd":2,"rs1":0,"rs2":1},{"op":"HALT","rd":0,"rs1":0,"rs2":0}])
+    out.append("\n[6] Simulator: VADD int16  [1,2,3,4]+[10,20,30,40]=[11,22,33,44]")
+    prog = assemble([Instr(OP_VADD, 2, 0, 1), Instr(OP_HALT)])
     sim = GPUSim(prog, verbose=False)
     sim.regfile[0] = pack_i16([1,2,3,4]); sim.regfile[1] = pack_i16([10,20,30,40])
     sim.run()
     check("r2=[11,22,33,44]", unpack_i16(sim.regfile[2]), [11,22,33,44])
 
-    print("\n[7] Simulator: VSUB int16  [10,20,30,40]-[1,2,3,4]=[9,18,27,36]")
-    prog = assemble([{"op":"VSUB","rd":2,"rs1":0,"rs2":1},{"op":"HALT","rd":0,"rs1":0,"rs2":0}])
+    out.append("\n[7] Simulator: VSUB int16  [10,20,30,40]-[1,2,3,4]=[9,18,27,36]")
+    prog = assemble([Instr(OP_VSUB, 2, 0, 1), Instr(OP_HALT)])
     sim = GPUSim(prog, verbose=False)
     sim.regfile[0] = pack_i16([10,20,30,40]); sim.regfile[1] = pack_i16([1,2,3,4])
     sim.run()
     check("r2=[9,18,27,36]", unpack_i16(sim.regfile[2]), [9,18,27,36])
 
-    print("\n[8] Simulator: RELU int16  max(0,[-5,-1,0,7])=[0,0,0,7]")
-    prog = assemble([{"op":"RELU","rd":1,"rs1":0,"rs2":0},{"op":"HALT","rd":0,"rs1":0,"rs2":0}])
+    out.append("\n[8] Simulator: RELU int16  max(0,[-5,-1,0,7])=[0,0,0,7]")
+    prog = assemble([Instr(OP_RELU, 1, 0), Instr(OP_HALT)])
     sim = GPUSim(prog, verbose=False)
     sim.regfile[0] = pack_i16([-5,-1,0,7])
     sim.run()
     check("r1=[0,0,0,7]", unpack_i16(sim.regfile[1]), [0,0,0,7])
 
-    print("\n[9] Simulator: VMUL bf16  [2]*[3]=[6]")
-    prog = assemble([{"op":"VMUL","rd":2,"rs1":0,"rs2":1},{"op":"HALT","rd":0,"rs1":0,"rs2":0}])
+    out.append("\n[9] Simulator: VMUL bf16  [2]*[3]=[6]")
+    prog = assemble([Instr(OP_VMUL, 2, 0, 1), Instr(OP_HALT)])
     sim = GPUSim(prog, verbose=False)
-    sim.regfile[0] = pack_bf16([BF(2)]*4); sim.regfile[1] = pack_bf16([BF(3)]*4)
+    sim.regfile[0] = _PACK_BF2; sim.regfile[1] = _PACK_BF3
     sim.run()
     got = [round(_bf16_to_float(x),1) for x in unpack_bf16(sim.regfile[2])]
     check("r2=[6,6,6,6]", got, [6.0]*4)
 
-    print("\n[10] Simulator: FMAC bf16  2*3+1=7  (r3 is acc)")
-    prog = assemble([{"op":"FMAC","rd":3,"rs1":1,"rs2":2},{"op":"HALT","rd":0,"rs1":0,"rs2":0}])
+    out.append("\n[10] Simulator: FMAC bf16  2*3+1=7  (r3 is acc)")
+    prog = assemble([Instr(OP_FMAC, 3, 1, 2), Instr(OP_HALT)])
     sim = GPUSim(prog, verbose=False)
-    sim.regfile[1] = pack_bf16([BF(2)]*4); sim.regfile[2] = pack_bf16([BF(3)]*4)
-    sim.regfile[3] = pack_bf16([BF(1)]*4)
+    sim.regfile[1] = _PACK_BF2; sim.regfile[2] = _PACK_BF3
+    sim.regfile[3] = _PACK_BF1
     sim.run()
     got = [round(_bf16_to_float(x),1) for x in unpack_bf16(sim.regfile[3])]
     check("r3=[7,7,7,7]", got, [7.0]*4)
 
-    print("\n[11] Simulator: VMUL stalls PC for 2 cycles")
-    prog = assemble([{"op":"VMUL","rd":2,"rs1":0,"rs2":1},{"op":"HALT","rd":0,"rs1":0,"rs2":0}])
+    out.append("\n[11] Simulator: VMUL stalls PC for 2 cycles")
+    prog = assemble([Instr(OP_VMUL, 2, 0, 1), Instr(OP_HALT)])
     sim = GPUSim(prog, verbose=False)
-    sim.regfile[0] = pack_bf16([BF(2)]*4); sim.regfile[1] = pack_bf16([BF(3)]*4)
+    sim.regfile[0] = _PACK_BF2; sim.regfile[1] = _PACK_BF3
     sim.run()
     check("3 cycles total (1 issue + 1 stall + 1 done+halt)", sim.cycle, 3)
 
-    print("\n[12] Simulator: FMAC stalls PC for 5 cycles")
-    prog = assemble([{"op":"FMAC","rd":3,"rs1":1,"rs2":2},{"op":"HALT","rd":0,"rs1":0,"rs2":0}])
+    out.append("\n[12] Simulator: FMAC stalls PC for 5 cycles")
+    prog = assemble([Instr(OP_FMAC, 3, 1, 2), Instr(OP_HALT)])
     sim = GPUSim(prog, verbose=False)
-    sim.regfile[1] = pack_bf16([BF(2)]*4); sim.regfile[2] = pack_bf16([BF(3)]*4)
-    sim.regfile[3] = pack_bf16([BF(1)]*4)
+    sim.regfile[1] = _PACK_BF2; sim.regfile[2] = _PACK_BF3
+    sim.regfile[3] = _PACK_BF1
     sim.run()
     check("6 cycles total (1 issue + 4 stall + 1 done+halt)", sim.cycle, 6)
 
-    print("\n[13] Simulator: LD / VADD / ST  (byte addr → word addr)")
+    out.append("\n[13] Simulator: LD / VADD / ST  (byte addr → word addr)")
     prog = assemble([
-        {"op":"LD",  "rd":1, "rs1":0, "rs2":0},
-        {"op":"LD",  "rd":2, "rs1":4, "rs2":0},
-        {"op":"VADD","rd":3, "rs1":1, "rs2":2},
-        {"op":"ST",  "rd":0, "rs1":5, "rs2":3},
-        {"op":"HALT","rd":0, "rs1":0, "rs2":0},
+        Instr(OP_LD,   1, 0),
+        Instr(OP_LD,   2, 4),
+        Instr(OP_VADD, 3, 1, 2),
+        Instr(OP_ST,   0, 5, 3),
+        Instr(OP_HALT),
     ])
     sim = GPUSim(prog, verbose=False)
     sim.regfile[0] = 0; sim.regfile[4] = 8; sim.regfile[5] = 16
@@ -212,8 +245,9 @@ def run_tests():
     sim.run()
     check("dmem[2]=[6,8,10,12]", unpack_i16(sim.dmem.get(2,0)), [6,8,10,12])
 
-    print(f"\n{'='*55}")
-    print(f"Results: {ok} passed, {fail} failed")
+    out.append(f"\n{'='*55}")
+    out.append(f"Results: {ok} passed, {fail} failed")
+    sys.stdout.write("\n".join(out) + "\n")
     return fail == 0
 
 
@@ -221,25 +255,24 @@ def run_tests():
 # Demo
 # ─────────────────────────────────────────────────────────────────────────────
 def run_demo():
-    BF = _float_to_bf16
     print("\n" + "="*65)
     print("  GPU Toolchain Demo  —  five kernel types, cycle trace")
     print("="*65)
     kernels = [
         {"name":"VADD int16  r2=[1,2,3,4]+[10,20,30,40]",
-         "prog":[{"op":"VADD","rd":2,"rs1":0,"rs2":1},{"op":"HALT","rd":0,"rs1":0,"rs2":0}],
+         "prog":[Instr(OP_VADD, 2, 0, 1), Instr(OP_HALT)],
          "regs":{0:pack_i16([1,2,3,4]),1:pack_i16([10,20,30,40])}},
         {"name":"VSUB int16  r2=[10,20,30,40]-[1,2,3,4]",
-         "prog":[{"op":"VSUB","rd":2,"rs1":0,"rs2":1},{"op":"HALT","rd":0,"rs1":0,"rs2":0}],
+         "prog":[Instr(OP_VSUB, 2, 0, 1), Instr(OP_HALT)],
          "regs":{0:pack_i16([10,20,30,40]),1:pack_i16([1,2,3,4])}},
         {"name":"VMUL bf16   r2=[2]*[3]=[6]",
-         "prog":[{"op":"VMUL","rd":2,"rs1":0,"rs2":1},{"op":"HALT","rd":0,"rs1":0,"rs2":0}],
-         "regs":{0:pack_bf16([BF(2)]*4),1:pack_bf16([BF(3)]*4)}},
+         "prog":[Instr(OP_VMUL, 2, 0, 1), Instr(OP_HALT)],
+         "regs":{0:_PACK_BF2,1:_PACK_BF3}},
         {"name":"FMAC bf16   r3=r1*r2+r3=2*3+1=7  (r3 is accumulator)",
-         "prog":[{"op":"FMAC","rd":3,"rs1":1,"rs2":2},{"op":"HALT","rd":0,"rs1":0,"rs2":0}],
-         "regs":{1:pack_bf16([BF(2)]*4),2:pack_bf16([BF(3)]*4),3:pack_bf16([BF(1)]*4)}},
+         "prog":[Instr(OP_FMAC, 3, 1, 2), Instr(OP_HALT)],
+         "regs":{1:_PACK_BF2,2:_PACK_BF3,3:_PACK_BF1}},
         {"name":"RELU int16  r1=max(0,[-5,-1,0,7])=[0,0,0,7]",
-         "prog":[{"op":"RELU","rd":1,"rs1":0,"rs2":0},{"op":"HALT","rd":0,"rs1":0,"rs2":0}],
+         "prog":[Instr(OP_RELU, 1, 0), Instr(OP_HALT)],
          "regs":{0:pack_i16([-5,-1,0,7])}},
     ]
     for k in kernels:
@@ -249,8 +282,7 @@ def run_demo():
         for r,v in k["regs"].items(): sim.regfile[r] = v
         sim.run()
 
-    fmac = assemble([{"op":"FMAC","rd":3,"rs1":1,"rs2":2},
-                     {"op":"HALT","rd":0,"rs1":0,"rs2":0}])
+    fmac = assemble([Instr(OP_FMAC, 3, 1, 2), Instr(OP_HALT)])
     write_outputs(fmac, "gpu_program")
 
 
@@ -297,8 +329,8 @@ def main():
     write_outputs(words, args.output)
 
     print("\nDisassembly:")
-    for i,w in enumerate(words):
-        print(f"  [{i:3d}]  {w:08X}   {disasm(w)}")
+    print("\n".join(f"  [{i:3d}]  {w:08X}   {disasm(w)}"
+                    for i, w in enumerate(words)))
 
     if args.sim:
         print("\n=== Simulation ===")
@@ -35,6 +35,10 @@ Hardware notes (from gpu_core.v):
   - Memory:                   64-bit words; byte address / 8 = word index.
 """
 
+from typing import NamedTuple
+
+import numpy as np
+
 # ── Opcode table ──────────────────────────────────────────────────────────────
 OPCODES = {
     #  name     code   dtype     description
@@ -53,6 +57,34 @@ OPCODE_TO_NAME = {v[0]: k for k, v in OPCODES.items()}
 DTYPE_ENC = {"INT16": 0x0, "BF16": 0x1}
 DTYPE_DEC = {0x0: "INT16", 0x1: "BF16"}
 
+# Mnemonic → raw opcode, precomputed so hot paths skip the OPCODES tuple probe.
+MN_TO_OP    = {mn: code for mn, (code, _dt) in OPCODES.items()}
+# Raw opcode → encoded dtype field (the opcode's natural type).
+OP_TO_DTYPE = {code: DTYPE_ENC[dt] for code, dt in OPCODES.values()}
+
+# Per-opcode constants for building Instr lists by hand (test/demo code).
+OP_VADD = OPCODES["VADD"][0]
+OP_VSUB = OPCODES["VSUB"][0]
+OP_VMUL = OPCODES["VMUL"][0]
+OP_FMAC = OPCODES["FMAC"][0]
+OP_RELU = OPCODES["RELU"][0]
+OP_LD   = OPCODES["LD"][0]
+OP_ST   = OPCODES["ST"][0]
+OP_HALT = OPCODES["HALT"][0]
+
+
+class Instr(NamedTuple):
+    """
+    One parsed instruction.  `op` is the raw 4-bit opcode (see OPCODES),
+    not the mnemonic string: field access is a slot offset instead of a
+    string hash, and each instruction is ~3× smaller than the old
+    per-instruction dict.
+    """
+    op:  int
+    rd:  int = 0
+    rs1: int = 0
+    rs2: int = 0
+
 NUM_REGS   = 16      # r0 – r15
 IMEM_DEPTH = 256     # instruction memory words
 DMEM_WORDS = 512     # data BRAM words (64-bit each)
@@ -73,35 +105,83 @@ def encode(opcode: int, dtype: int, rd: int, rs1: int, rs2: int) -> int:
     return (opcode << 28) | (dtype << 24) | (rd << 20) | (rs1 << 16) | (rs2 << 12)
 
 
-def decode(word: int) -> dict:
-    """Unpack a 32-bit instruction word into its fields."""
-    return {
-        "opcode": (word >> 28) & 0xF,
-        "dtype":  (word >> 24) & 0xF,
-        "rd":     (word >> 20) & 0xF,
-        "rs1":    (word >> 16) & 0xF,
-        "rs2":    (word >> 12) & 0xF,
-    }
+def _encode_fast(opcode: int, dtype: int, rd: int, rs1: int, rs2: int) -> int:
+    """
+    encode() without the per-field assertions, for internal call sites whose
+    fields are already validated (parsers, assembler inner loop).  Each field
+    is masked to 4 bits so a bad value can never corrupt neighbouring fields;
+    encode() remains the checked public API.
+    """
+    return ((opcode & 0xF) << 28) | ((dtype & 0xF) << 24) | ((rd & 0xF) << 20) \
+         | ((rs1 & 0xF) << 16) | ((rs2 & 0xF) << 12)
+
+
+try:
+    # Optional compiled fast path (see _isa_native.pyx, built with
+    # `cythonize -i`); the pure-Python version above is the fallback.
+    from _isa_native import encode_fast as _encode_fast  # noqa: F811
+except ImportError:
+    pass
+
+
+def encode_batch(opcodes, dtypes, rds, rs1s, rs2s) -> np.ndarray:
+    """
+    Vectorized encode: pack parallel field arrays (SoA layout) into a
+    uint32 array of instruction words in one fused expression.
+
+    Fields are validated once per array instead of once per instruction;
+    inputs can be anything np.asarray accepts (lists, arrays, ...).
+    """
+    ops  = np.asarray(opcodes, dtype=np.uint32)
+    dts  = np.asarray(dtypes,  dtype=np.uint32)
+    rds  = np.asarray(rds,     dtype=np.uint32)
+    rs1s = np.asarray(rs1s,    dtype=np.uint32)
+    rs2s = np.asarray(rs2s,    dtype=np.uint32)
+    assert (ops  <= 0xF).all(), "opcode out of range"
+    assert (dts  <= 0xF).all(), "dtype out of range"
+    assert (rds  <= 0xF).all(), "rd out of range"
+    assert (rs1s <= 0xF).all(), "rs1 out of range"
+    assert (rs2s <= 0xF).all(), "rs2 out of range"
+    return (ops << 28) | (dts << 24) | (rds << 20) | (rs1s << 16) | (rs2s << 12)
+
+
+def decode(word: int) -> tuple:
+    """
+    Unpack a 32-bit instruction word into (opcode, dtype, rd, rs1, rs2).
+    A plain tuple: no dict allocation or key hashing per decoded word —
+    callers that want named fields use decode_dict().
+    """
+    return ((word >> 28) & 0xF, (word >> 24) & 0xF, (word >> 20) & 0xF,
+            (word >> 16) & 0xF, (word >> 12) & 0xF)
+
+
+def decode_dict(word: int) -> dict:
+    """decode() with string-keyed fields, for display/debug call sites."""
+    opcode, dtype, rd, rs1, rs2 = decode(word)
+    return {"opcode": opcode, "dtype": dtype, "rd": rd, "rs1": rs1, "rs2": rs2}
+
+
+# Disassembly formatters indexed by opcode: one table load per word instead
+# of walking a chain of opcode comparisons.
+_DISASM_FMT = [None] * 16
+_DISASM_FMT[OP_VADD] = lambda rd, rs1, rs2: f"VADD     r{rd}, r{rs1}, r{rs2}"
+_DISASM_FMT[OP_VSUB] = lambda rd, rs1, rs2: f"VSUB     r{rd}, r{rs1}, r{rs2}"
+_DISASM_FMT[OP_VMUL] = lambda rd, rs1, rs2: f"VMUL     r{rd}, r{rs1}, r{rs2}"
+_DISASM_FMT[OP_FMAC] = lambda rd, rs1, rs2: (
+    f"FMAC     r{rd}, r{rs1}, r{rs2}   ; rd = rs1*rs2 + rd")
+_DISASM_FMT[OP_RELU] = lambda rd, rs1, rs2: f"RELU     r{rd}, r{rs1}"
+_DISASM_FMT[OP_LD]   = lambda rd, rs1, rs2: f"LD       r{rd}, [r{rs1}]"
+_DISASM_FMT[OP_ST]   = lambda rd, rs1, rs2: f"ST       [r{rs1}], r{rs2}"
+_DISASM_FMT[OP_HALT] = lambda rd, rs1, rs2: "HALT"
 
 
 def disasm(word: int) -> str:
     """Human-readable disassembly of one instruction word."""
-    d = decode(word)
-    name  = OPCODE_TO_NAME.get(d["opcode"], f"OP{d['opcode']:X}")
-    dtype = DTYPE_DEC.get(d["dtype"], f"T{d['dtype']:X}")
-    oc    = d["opcode"]
-
-    if oc == OPCODES["HALT"][0]:
-        return "HALT"
-    if oc == OPCODES["LD"][0]:
-        return f"LD       r{d['rd']}, [r{d['rs1']}]"
-    if oc == OPCODES["ST"][0]:
-        return f"ST       [r{d['rs1']}], r{d['rs2']}"
-    if oc == OPCODES["RELU"][0]:
-        return f"RELU     r{d['rd']}, r{d['rs1']}"
-    if oc == OPCODES["FMAC"][0]:
-        return f"FMAC     r{d['rd']}, r{d['rs1']}, r{d['rs2']}   ; rd = rs1*rs2 + rd"
-    return f"{name:<6}   r{d['rd']}, r{d['rs1']}, r{d['rs2']}"
+    opcode, _dtype, rd, rs1, rs2 = decode(word)
+    fmt = _DISASM_FMT[opcode]
+    if fmt is None:
+        return f"{f'OP{opcode:X}':<6}   r{rd}, r{rs1}, r{rs2}"
+    return fmt(rd, rs1, rs2)
 
 
 def instruction(mnemonic: str, rd=0, rs1=0, rs2=0) -> int:
@@ -109,8 +189,7 @@ def instruction(mnemonic: str, rd=0, rs1=0, rs2=0) -> int:
     Convenience: build an instruction word from a mnemonic string.
     dtype is determined by the opcode's natural type (see OPCODES table).
     """
-    mn = mnemonic.upper()
-    if mn not in OPCODES:
+    opcode = MN_TO_OP.get(mnemonic.upper())
+    if opcode is None:
         raise ValueError(f"Unknown mnemonic: {mnemonic!r}")
-    opcode, dtype_str = OPCODES[mn]
-    return encode(opcode, DTYPE_ENC[dtype_str], rd, rs1, rs2)
\ No newline at end of file
+    return _encode_fast(opcode, OP_TO_DTYPE[opcode], rd, rs1, rs2)
\ No newline at end of file
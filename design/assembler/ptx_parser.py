@@ -32,8 +32,12 @@ PTX register allocation:
 
 import re
 import sys
+import threading
 from typing import Optional
 
+from isa import (Instr, OP_VADD, OP_VSUB, OP_VMUL, OP_FMAC, OP_RELU,
+                 OP_LD, OP_ST, OP_HALT)
+
 # Lines beginning with these patterns are PTX boilerplate — skip silently.
 _SKIP_PATTERNS = [
     r"^\s*\.",           # directives: .version, .target, .reg, .param, .local ...
@@ -61,33 +65,151 @@ _SKIP_PATTERNS = [
     r"\band\.\s*b32\b",  # bitwise and (index masking)
 ]
 
+# Compiled once at import into a single alternation: one regex engine scan
+# per line instead of one per pattern.
+_SKIP_COMBINED = re.compile("(?:" + ")|(?:".join(_SKIP_PATTERNS) + ")")
+
+# Leading characters that identify boilerplate outright (directives,
+# comments, braces, predicated instructions) — checked before the regex,
+# since these account for the bulk of skipped lines.
+_SKIP_PREFIXES = (".", "//", "{", "}", "@")
+
+# The grammar is closed (eight instruction forms), so the hot path needs no
+# regex at all: the first whitespace token selects the form, and operands
+# are split out with plain C-level string ops.
+_PARSE_HEADS = {
+    "add.s16": "VADD", "add.u16": "VADD",
+    "sub.s16": "VSUB", "sub.u16": "VSUB",
+    "mul.rn.bf16": "VMUL",
+    "fma.rn.bf16": "FMAC",
+    "max.s16": "RELU", "max.u16": "RELU",
+}
+
+_N_OPERANDS = {"HALT": 0, "LD": 2, "ST": 2, "VADD": 3, "VSUB": 3,
+               "VMUL": 3, "FMAC": 4, "RELU": 2}
+
+# First-token stems (text before the first '.') whose every variant is
+# boilerplate — lets _should_skip bypass the regex for the common movs,
+# conversions, predicates and branches.
+_SKIP_STEMS = frozenset({"mov", "cvta", "cvt", "setp", "bra", "shl"})
+
+
+# ── Instruction builders (one per matched form) ──────────────────────────────
+
+def _build_halt(parser, ops, lineno):
+    return Instr(OP_HALT)
+
+
+def _build_ld(parser, ops, lineno):
+    return Instr(OP_LD, rd=parser._reg(ops[0]), rs1=parser._reg(ops[1]))
+
+
+def _build_st(parser, ops, lineno):
+    return Instr(OP_ST, rs1=parser._reg(ops[0]), rs2=parser._reg(ops[1]))
+
+
+def _build_relu(parser, ops, lineno):
+    return Instr(OP_RELU, rd=parser._reg(ops[0]), rs1=parser._reg(ops[1]))
+
+
+def _build_alu(op):
+    """Builder for the three-operand forms (VADD / VSUB / VMUL)."""
+    def build(parser, ops, lineno):
+        return Instr(op, rd=parser._reg(ops[0]),
+                     rs1=parser._reg(ops[1]), rs2=parser._reg(ops[2]))
+    return build
+
+
+def _build_fmac(parser, ops, lineno):
+    # PTX: rd = rs1*rs2 + acc   Hardware: rd = rs1*rs2 + rd (acc=rd)
+    # We map acc to rd so the accumulator register is reused correctly.
+    rd_name, rs1_name, rs2_name, acc_name = ops
+    # If acc != rd in PTX, warn: hardware always reads rd as accumulator
+    if acc_name != rd_name and parser.verbose:
+        print(
+            f"  [PTX line {lineno}] FMAC: PTX accumulator {acc_name!r} "
+            f"mapped to rd={rd_name!r}; hardware reads rd as accumulator. "
+            f"Ensure {acc_name!r} and {rd_name!r} are the same register "
+            f"or initialise rd before issuing FMAC.",
+            file=sys.stderr,
+        )
+    return Instr(OP_FMAC, rd=parser._reg(rd_name),
+                 rs1=parser._reg(rs1_name), rs2=parser._reg(rs2_name))
+
+
+_BUILDERS = {
+    "HALT": _build_halt,
+    "LD":   _build_ld,
+    "ST":   _build_st,
+    "VADD": _build_alu(OP_VADD),
+    "VSUB": _build_alu(OP_VSUB),
+    "VMUL": _build_alu(OP_VMUL),
+    "FMAC": _build_fmac,
+    "RELU": _build_relu,
+}
+
+# A complete register token — operands must fullmatch this, so offset
+# addressing like [%rd1+8] (which the hardware has no encoding for) falls
+# through to the unrecognised-line warning instead of silently mapping a
+# phantom register name.
+_REG_RE = re.compile(r"%\w+")
+
+# Head token → (builder, operand count, relu special-case, index of the
+# bracketed memory operand or -1) fused into one table at import, so the
+# hot path pays a single dict probe instead of three (_PARSE_HEADS,
+# _N_OPERANDS, _BUILDERS) per instruction line.
+_HEAD_DISPATCH = {
+    head: (_BUILDERS[key], _N_OPERANDS[key], key == "RELU", -1)
+    for head, key in _PARSE_HEADS.items()
+}
+_LD_ENTRY = (_BUILDERS["LD"], _N_OPERANDS["LD"], False, 1)
+_ST_ENTRY = (_BUILDERS["ST"], _N_OPERANDS["ST"], False, 0)
+
+
+class _RegMap(dict):
+    """
+    PTX register name → GPU register number, assigned in first-seen order.
+    __missing__ hands out the next free register on first lookup, so the
+    hot path is a single dict probe instead of a membership test + insert.
+    """
+    def __missing__(self, name):
+        n = len(self)
+        if n >= 16:
+            raise ValueError(
+                f"PTX kernel uses more than 16 registers; cannot map {name!r}.\n"
+                "Split into multiple kernels or reuse registers."
+            )
+        self[name] = n
+        return n
+
 
 class PTXParser:
     def __init__(self, verbose: bool = True):
         self.verbose   = verbose
-        self._reg_map: dict[str, int] = {}   # PTX name → GPU reg number
-        self._warnings: list[str]     = []
+        self._reg_map  = _RegMap()           # PTX name → GPU reg number
+        self._warnings: list[str] = []
 
     # ── Public API ────────────────────────────────────────────────────────────
 
-    def parse(self, ptx_text: str) -> list[dict]:
+    def parse(self, ptx_text: str) -> list[Instr]:
         """
-        Parse PTX source text and return a list of GPU instruction dicts.
+        Parse PTX source text and return a list of isa.Instr tuples.
 
-        Each dict has keys:
-          op    str   mnemonic (VADD / VSUB / VMUL / FMAC / RELU / LD / ST / HALT)
+        Each Instr carries:
+          op    int   raw opcode (see isa.OPCODES / OP_* constants)
           rd    int   destination register index (0–15)
           rs1   int   source register 1 index
           rs2   int   source register 2 index
 
         Raises ValueError if an unrecognised critical instruction is encountered.
         """
-        self._reg_map = {}
-        self._warnings = []
+        self.reset()
         instructions = []
 
         for lineno, raw in enumerate(ptx_text.splitlines(), start=1):
-            line = re.sub(r"//.*", "", raw).strip().rstrip(";").strip()
+            # partition is a plain C string op — most lines carry no comment,
+            # so don't pay for a regex substitution per line.
+            line = raw.partition("//")[0].strip().rstrip(";").strip()
             if not line:
                 continue
             if self._should_skip(line):
@@ -108,6 +230,11 @@ class PTXParser:
 
         return instructions
 
+    def reset(self) -> None:
+        """Clear per-kernel state so one parser instance can be reused."""
+        self._reg_map.clear()
+        self._warnings.clear()
+
     @property
     def reg_map(self) -> dict[str, int]:
         """PTX register name → GPU register number after last parse()."""
@@ -116,95 +243,70 @@ class PTXParser:
     # ── Internal helpers ──────────────────────────────────────────────────────
 
     def _should_skip(self, line: str) -> bool:
-        return any(re.search(p, line) for p in _SKIP_PATTERNS)
+        if line.startswith(_SKIP_PREFIXES):
+            return True
+        if line.partition(".")[0] in _SKIP_STEMS:
+            return True
+        return _SKIP_COMBINED.search(line) is not None
 
     def _reg(self, name: str) -> int:
         """Map a PTX register name to a GPU physical register number."""
-        if name not in self._reg_map:
-            n = len(self._reg_map)
-            if n >= 16:
-                raise ValueError(
-                    f"PTX kernel uses more than 16 registers; cannot map {name!r}.\n"
-                    "Split into multiple kernels or reuse registers."
-                )
-            self._reg_map[name] = n
         return self._reg_map[name]
 
-    def _try_parse_line(self, line: str, lineno: int) -> Optional[dict]:
-        # ── ret → HALT ────────────────────────────────────────────────────────
-        if re.match(r"ret\b", line):
-            return {"op": "HALT", "rd": 0, "rs1": 0, "rs2": 0}
-
-        # ── ld.global.{u64,b64,s16,...}  rd, [base] ───────────────────────────
-        m = re.match(
-            r"ld\.global\.\w+\s+(%\w+)\s*,\s*\[(%\w+)\s*\]", line)
-        if m:
-            return {"op": "LD", "rd": self._reg(m.group(1)),
-                    "rs1": self._reg(m.group(2)), "rs2": 0}
-
-        # ── st.global.{u64,b64,s16,...}  [base], rs2 ─────────────────────────
-        m = re.match(
-            r"st\.global\.\w+\s+\[(%\w+)\s*\]\s*,\s*(%\w+)", line)
-        if m:
-            return {"op": "ST", "rd": 0,
-                    "rs1": self._reg(m.group(1)), "rs2": self._reg(m.group(2))}
-
-        # ── add.s16 / add.u16  rd, rs1, rs2 → VADD ───────────────────────────
-        m = re.match(r"add\.[su]16\s+(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)", line)
-        if m:
-            return {"op": "VADD", "rd": self._reg(m.group(1)),
-                    "rs1": self._reg(m.group(2)), "rs2": self._reg(m.group(3))}
-
-        # ── sub.s16 / sub.u16  rd, rs1, rs2 → VSUB ───────────────────────────
-        m = re.match(r"sub\.[su]16\s+(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)", line)
-        if m:
-            return {"op": "VSUB", "rd": self._reg(m.group(1)),
-                    "rs1": self._reg(m.group(2)), "rs2": self._reg(m.group(3))}
-
-        # ── mul.rn.bf16  rd, rs1, rs2 → VMUL ─────────────────────────────────
-        m = re.match(r"mul\.rn\.bf16\s+(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)", line)
-        if m:
-            return {"op": "VMUL", "rd": self._reg(m.group(1)),
-                    "rs1": self._reg(m.group(2)), "rs2": self._reg(m.group(3))}
-
-        # ── fma.rn.bf16  rd, rs1, rs2, acc → FMAC ────────────────────────────
-        # PTX: rd = rs1*rs2 + acc   Hardware: rd = rs1*rs2 + rd (acc=rd)
-        # We map acc to rd so the accumulator register is reused correctly.
-        m = re.match(
-            r"fma\.rn\.bf16\s+(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)",
-            line)
-        if m:
-            rd_name  = m.group(1)
-            rs1_name = m.group(2)
-            rs2_name = m.group(3)
-            acc_name = m.group(4)
-            # If acc != rd in PTX, warn: hardware always reads rd as accumulator
-            if acc_name != rd_name and self.verbose:
-                print(
-                    f"  [PTX line {lineno}] FMAC: PTX accumulator {acc_name!r} "
-                    f"mapped to rd={rd_name!r}; hardware reads rd as accumulator. "
-                    f"Ensure {acc_name!r} and {rd_name!r} are the same register "
-                    f"or initialise rd before issuing FMAC.",
-                    file=sys.stderr,
-                )
-            return {"op": "FMAC", "rd": self._reg(rd_name),
-                    "rs1": self._reg(rs1_name), "rs2": self._reg(rs2_name)}
-
-        # ── max.s16  rd, rs1, 0 → RELU ────────────────────────────────────────
-        m = re.match(r"max\.[su]16\s+(%\w+)\s*,\s*(%\w+)\s*,\s*0\b", line)
-        if m:
-            return {"op": "RELU", "rd": self._reg(m.group(1)),
-                    "rs1": self._reg(m.group(2)), "rs2": 0}
-
-        return None  # unrecognised
-
-
-def parse_ptx_file(path: str, verbose: bool = True) -> list[dict]:
+    def _try_parse_line(self, line: str, lineno: int) -> Optional[Instr]:
+        parts = line.split(None, 1)
+        head  = parts[0]
+        rest  = parts[1] if len(parts) > 1 else ""
+
+        if head == "ret" or head.startswith("ret."):
+            return _build_halt(self, (), lineno)
+
+        entry = _HEAD_DISPATCH.get(head)
+        if entry is None:
+            if head.startswith("ld.global."):
+                entry = _LD_ENTRY
+            elif head.startswith("st.global."):
+                entry = _ST_ENTRY
+            else:
+                return None  # unrecognised
+        build, n_operands, is_relu, mem_idx = entry
+
+        ops = [t.strip() for t in rest.split(",")]
+        if is_relu:
+            # max.s16 rd, rs1, 0 — only the max-with-literal-zero form maps.
+            if len(ops) != 3 or ops[2] != "0":
+                return None
+            ops = ops[:2]
+        if len(ops) != n_operands:
+            return None  # unrecognised
+        if mem_idx >= 0:
+            # The LD/ST memory operand must be a bracketed bare register.
+            t = ops[mem_idx]
+            if not (t.startswith("[") and t.endswith("]")):
+                return None
+            ops[mem_idx] = t[1:-1].strip()
+        if not all(_REG_RE.fullmatch(t) for t in ops):
+            return None  # unrecognised
+        return build(self, ops, lineno)
+
+
+# Shared parser for parse_ptx_file: repeated invocations reuse one instance
+# (reset between files) instead of re-allocating parser state per call.
+_shared_parser: Optional[PTXParser] = None
+_shared_lock = threading.Lock()
+
+
+def parse_ptx_file(path: str, verbose: bool = True) -> list[Instr]:
     """Convenience wrapper: read a .ptx file and return instruction list."""
+    global _shared_parser
     with open(path) as f:
         text = f.read()
-    parser = PTXParser(verbose=verbose)
-    instructions = parser.parse(text)
+    with _shared_lock:
+        if _shared_parser is None:
+            _shared_parser = PTXParser(verbose=verbose)
+        _shared_parser.verbose = verbose
+        instructions = _shared_parser.parse(text)
+        reg_map = _shared_parser.reg_map
     if verbose:
-        print(f"  PTX register mapping: {parser.reg_map}")
+        print(f"  PTX register mapping: {reg_map}")
     return instructions
\ No newline at end of file
@@ -15,9 +15,11 @@ Then translates the PTX to your GPU's 32-bit opcodes and writes:
     gpu_program.lst   ← annotated listing for debugging
 """
 
-import re, sys, subprocess, argparse
+import functools, re, sys, subprocess, argparse
 from pathlib import Path
 
+import numpy as np
+
 # ─── Opcode encoding — must match control_unit.v exactly ─────────────────────
 #
 #  Bit [31:28] opcode   Bit [27:24] dtype   Bit [23:20] rd
@@ -48,6 +50,7 @@ def encode(mnemonic, rd=0, rs1=0, rs2=0):
     op, dtype = OPCODES[mnemonic]
     return (op << 28) | (dtype << 24) | (rd << 20) | (rs1 << 16) | (rs2 << 12)
 
+@functools.lru_cache(maxsize=512)
 def disasm(word):
     op  = (word >> 28) & 0xF
     rd  = (word >> 20) & 0xF
@@ -63,8 +66,8 @@ def disasm(word):
 
 # ─── Step 1: run nvcc ─────────────────────────────────────────────────────────
 
-def run_nvcc(cu_path, ptx_path):
-    cmd = ["nvcc", "-ptx", "-arch=sm_80", str(cu_path), "-o", str(ptx_path)]
+def run_nvcc(cu_path, ptx_path, arch="sm_80"):
+    cmd = ["nvcc", "-ptx", f"-arch={arch}", str(cu_path), "-o", str(ptx_path)]
     print("  $", " ".join(cmd))
     r = subprocess.run(cmd, capture_output=True, text=True)
     if r.returncode != 0:
@@ -79,14 +82,20 @@ def extract_kernels(ptx):
     for m in re.finditer(r'\.(?:visible\s+)?entry\s+(\w+)\s*\(', ptx):
         name  = m.group(1)
         start = ptx.index('{', m.start())
-        depth = 0
-        for i in range(start, len(ptx)):
-            if ptx[i] == '{': depth += 1
-            elif ptx[i] == '}':
-                depth -= 1
-                if depth == 0:
-                    kernels[name] = ptx[start+1:i]
-                    break
+        # Bounce between the next '{' and '}' with str.find (C-level scans)
+        # instead of visiting every character to track brace depth.
+        depth, i = 1, start + 1
+        while depth:
+            close_b = ptx.find('}', i)
+            if close_b == -1:
+                break   # unbalanced braces — drop the entry, as before
+            open_b = ptx.find('{', i, close_b)
+            if open_b != -1:
+                depth += 1; i = open_b + 1
+            else:
+                depth -= 1; i = close_b + 1
+        else:
+            kernels[name] = ptx[start+1:i-1]
     return kernels
 
 # ─── Step 3: translate PTX body → instruction list ────────────────────────────
@@ -106,83 +115,125 @@ _SKIP = [
     r'^\s*//',
 ]
 
+# All skip patterns combined into one alternation at import: one regex scan
+# per line instead of ~15 re.search calls.
+_SKIP_RE = re.compile('|'.join(f'(?:{p})' for p in _SKIP))
+
 def _skip(line):
-    return any(re.search(p, line) for p in _SKIP)
-
-class Regs:
-    """Map PTX virtual registers to GPU r0–r15 in first-seen order."""
-    def __init__(self):
-        self._m = {}
-    def __call__(self, name):
-        if name not in self._m:
-            n = len(self._m)
-            if n >= 16:
-                sys.exit(f"Kernel uses >16 registers (can't map {name!r}). Split the kernel.")
-            self._m[name] = n
-        return self._m[name]
-    def mapping(self):
-        return dict(self._m)
+    return _SKIP_RE.search(line) is not None
+
+# Instruction patterns, compiled once at import — translate() used to rebuild
+# each rf'...' pattern (and hash the re cache) on every PTX line.
+_R = r'(%\w+)'
+_COMMENT  = re.compile(r'//.*')
+_PAT_RET  = re.compile(r'ret\b')
+_PAT_LD   = re.compile(rf'ld\.global\.\w+\s+{_R}\s*,\s*\[{_R}\]')
+_PAT_ST   = re.compile(rf'st\.global\.\w+\s+\[{_R}\]\s*,\s*{_R}')
+_PAT_VADD = re.compile(rf'add\.[su]16\s+{_R}\s*,\s*{_R}\s*,\s*{_R}')
+_PAT_VSUB = re.compile(rf'sub\.[su]16\s+{_R}\s*,\s*{_R}\s*,\s*{_R}')
+_PAT_VMUL = re.compile(rf'mul\.rn\.bf16\s+{_R}\s*,\s*{_R}\s*,\s*{_R}')
+_PAT_FMA  = re.compile(rf'fma\.rn\.bf16\s+{_R}\s*,\s*{_R}\s*,\s*{_R}\s*,\s*{_R}')
+_PAT_RELU = re.compile(rf'max\.[su]16\s+{_R}\s*,\s*{_R}\s*,\s*0\b')
+
+# One handler per instruction form, returning (op, rd, rs1, rs2);
+# `reg` is the per-kernel register mapper.
+def _h_halt(m, reg): return ("HALT", 0, 0, 0)
+def _h_ld(m, reg):   return ("LD",   reg[m[1]], reg[m[2]], 0)
+def _h_st(m, reg):   return ("ST",   0, reg[m[1]], reg[m[2]])
+def _h_vadd(m, reg): return ("VADD", reg[m[1]], reg[m[2]], reg[m[3]])
+def _h_vsub(m, reg): return ("VSUB", reg[m[1]], reg[m[2]], reg[m[3]])
+def _h_vmul(m, reg): return ("VMUL", reg[m[1]], reg[m[2]], reg[m[3]])
+def _h_relu(m, reg): return ("RELU", reg[m[1]], reg[m[2]], 0)
+
+def _h_fma(m, reg):
+    rd_n = m[1]
+    if m[4] != rd_n:
+        print(f"  [WARN] FMAC: acc={m[4]} != rd={rd_n}; hardware reads rd as acc")
+    return ("FMAC", reg[rd_n], reg[m[2]], reg[m[3]])
+
+# The mnemonic stem (text before the first '.') picks the one pattern that
+# can match, so each line pays a dict probe plus one regex instead of a
+# cascade through all eight patterns.
+_DISPATCH = {
+    'ret': (_PAT_RET,  _h_halt),
+    'ld':  (_PAT_LD,   _h_ld),
+    'st':  (_PAT_ST,   _h_st),
+    'add': (_PAT_VADD, _h_vadd),
+    'sub': (_PAT_VSUB, _h_vsub),
+    'mul': (_PAT_VMUL, _h_vmul),
+    'fma': (_PAT_FMA,  _h_fma),
+    'max': (_PAT_RELU, _h_relu),
+}
+
+class Regs(dict):
+    """
+    Map PTX virtual registers to GPU r0–r15 in first-seen order.
+    __missing__ hands out the next free register on first lookup, so the
+    hot path is a single dict probe instead of a membership test + insert.
+    """
+    def __missing__(self, name):
+        n = len(self)
+        if n >= 16:
+            sys.exit(f"Kernel uses >16 registers (can't map {name!r}). Split the kernel.")
+        self[name] = n
+        return n
+
+def _normalize(body):
+    """Comment-strip and trim each line once; translate iterates the result."""
+    return [s for s in (_COMMENT.sub('', l).strip().rstrip(';').strip()
+                        for l in body.splitlines()) if s]
 
 def translate(body, name):
     reg = Regs()
-    insns = []
-    R = r'(%\w+)'
+    # SoA instruction buffer: four parallel columns instead of a dict per
+    # instruction — far less allocator churn, and assemble() consumes the
+    # columns directly.
+    ops, rds, rs1s, rs2s = [], [], [], []
 
-    for line in body.splitlines():
-        line = re.sub(r'//.*', '', line).strip().rstrip(';').strip()
-        if not line or _skip(line):
+    for line in _normalize(body):
+        if _skip(line):
             continue
 
-        m = re.match(r'ret\b', line)
-        if m:
-            insns.append({"op":"HALT","rd":0,"rs1":0,"rs2":0}); continue
-
-        m = re.match(rf'ld\.global\.\w+\s+{R}\s*,\s*\[{R}\]', line)
-        if m:
-            insns.append({"op":"LD","rd":reg(m[1]),"rs1":reg(m[2]),"rs2":0}); continue
-
-        m = re.match(rf'st\.global\.\w+\s+\[{R}\]\s*,\s*{R}', line)
-        if m:
-            insns.append({"op":"ST","rd":0,"rs1":reg(m[1]),"rs2":reg(m[2])}); continue
-
-        m = re.match(rf'add\.[su]16\s+{R}\s*,\s*{R}\s*,\s*{R}', line)
-        if m:
-            insns.append({"op":"VADD","rd":reg(m[1]),"rs1":reg(m[2]),"rs2":reg(m[3])}); continue
-
-        m = re.match(rf'sub\.[su]16\s+{R}\s*,\s*{R}\s*,\s*{R}', line)
-        if m:
-            insns.append({"op":"VSUB","rd":reg(m[1]),"rs1":reg(m[2]),"rs2":reg(m[3])}); continue
-
-        m = re.match(rf'mul\.rn\.bf16\s+{R}\s*,\s*{R}\s*,\s*{R}', line)
-        if m:
-            insns.append({"op":"VMUL","rd":reg(m[1]),"rs1":reg(m[2]),"rs2":reg(m[3])}); continue
-
-        m = re.match(rf'fma\.rn\.bf16\s+{R}\s*,\s*{R}\s*,\s*{R}\s*,\s*{R}', line)
-        if m:
-            rd_n = m[1]
-            if m[4] != rd_n:
-                print(f"  [WARN] FMAC: acc={m[4]} != rd={rd_n}; hardware reads rd as acc")
-            insns.append({"op":"FMAC","rd":reg(rd_n),"rs1":reg(m[2]),"rs2":reg(m[3])}); continue
-
-        m = re.match(rf'max\.[su]16\s+{R}\s*,\s*{R}\s*,\s*0\b', line)
-        if m:
-            insns.append({"op":"RELU","rd":reg(m[1]),"rs1":reg(m[2]),"rs2":0}); continue
+        entry = _DISPATCH.get(line.partition('.')[0].partition(' ')[0])
+        if entry:
+            m = entry[0].match(line)
+            if m:
+                op, rd, rs1, rs2 = entry[1](m, reg)
+                ops.append(op); rds.append(rd); rs1s.append(rs1); rs2s.append(rs2)
+                continue
 
         # unrecognised — skip silently (it's likely index arithmetic nvcc emits)
 
-    print(f"  registers: {reg.mapping()}")
-    return insns
+    print(f"  registers: {dict(reg)}")
+    return ops, rds, rs1s, rs2s
 
 # ─── Step 4: assemble → words → files ────────────────────────────────────────
 
-def assemble(insns):
-    return [encode(i["op"], i.get("rd",0), i.get("rs1",0), i.get("rs2",0)) for i in insns]
+# op and dtype packed into the top byte per mnemonic, so assemble() is one
+# vectorized OR over the whole program instead of a Python encode() call
+# (dict probe + 5 shifts/ORs) per instruction.
+_MN_TO_TOP = {mn: (op << 28) | (dt << 24) for mn, (op, dt) in OPCODES.items()}
 
-def write_mem(words, path, depth=256):
-    halt = encode("HALT")
-    with open(path, "w") as f:
-        for w in words:       f.write(f"{w:08X}\n")
-        for _ in range(len(words), depth): f.write(f"{halt:08X}\n")
+def assemble(insns):
+    ops, rds, rs1s, rs2s = insns
+    tops = np.fromiter((_MN_TO_TOP[op] for op in ops), np.uint32, count=len(ops))
+    rds  = np.asarray(rds,  dtype=np.uint32)
+    rs1s = np.asarray(rs1s, dtype=np.uint32)
+    rs2s = np.asarray(rs2s, dtype=np.uint32)
+    return (tops | (rds << 20) | (rs1s << 16) | (rs2s << 12)).tolist()
+
+def write_mem(words, dest, depth=256):
+    # One big-endian uint32 buffer → hex string → single write, instead of
+    # `depth` per-word format + write calls.  `dest` is a filesystem path or
+    # any object with .write() (e.g. io.StringIO in tests — no disk needed).
+    padded = list(words) + [encode("HALT")] * (depth - len(words))
+    hexstr = np.asarray(padded, dtype='>u4').tobytes().hex().upper()
+    body   = "\n".join(hexstr[i:i+8] for i in range(0, len(hexstr), 8)) + "\n"
+    if hasattr(dest, "write"):
+        dest.write(body)
+    else:
+        with open(dest, "w") as f:
+            f.write(body)
 
 def write_lst(words, path, kernel):
     with open(path, "w") as f:
@@ -198,15 +249,22 @@ def main():
     ap.add_argument("cu", help=".cu source file")
     ap.add_argument("--kernel", help="kernel function name (default: first found)")
     ap.add_argument("--list",   action="store_true", help="list kernels and exit")
+    ap.add_argument("--force",  action="store_true",
+                    help="rerun nvcc even if the .ptx is up to date")
+    ap.add_argument("--arch",   default="sm_80", help="nvcc -arch value")
     ap.add_argument("-o",       default="gpu_program", help="output base name")
     args = ap.parse_args()
 
     cu   = Path(args.cu)
     ptx  = cu.with_suffix(".ptx")
 
-    # 1. Compile
+    # 1. Compile — skipped Make-style when the .ptx is already newer than
+    # the .cu (nvcc startup dominates the whole script otherwise)
     print(f"\n[1] nvcc: {cu.name} → {ptx.name}")
-    run_nvcc(cu, ptx)
+    if not args.force and ptx.exists() and ptx.stat().st_mtime >= cu.stat().st_mtime:
+        print("  (ptx up to date, skipping nvcc — use --force to rerun)")
+    else:
+        run_nvcc(cu, ptx, args.arch)
 
     # 2. Find kernels
     text    = ptx.read_text()
@@ -225,7 +283,7 @@ def main():
 
     # 4. Translate PTX → instructions
     insns = translate(kernels[name], name)
-    print(f"  {len(insns)} instructions")
+    print(f"  {len(insns[0])} instructions")
 
     # 5. Assemble → words → files
     words    = assemble(insns)
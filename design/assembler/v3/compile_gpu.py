@@ -36,7 +36,8 @@ The translator handles all of this by:
      This matches what the testbench pre-loads into regfile[1/3/5/7].
 """
 
-import re, sys, subprocess, argparse
+import argparse, array, functools, hashlib, itertools, os, pickle, re, subprocess, sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # ── ISA ──────────────────────────────────────────────────────────────────────
@@ -49,6 +50,10 @@ def encode(mn, rd=0, rs1=0, rs2=0):
     op, dtype = OPCODES[mn]
     return (op<<28)|(dtype<<24)|(rd<<20)|(rs1<<16)|(rs2<<12)
 
+# HALT fill for unused imem words.
+_HALT_WORD = encode("HALT")
+
+@functools.lru_cache(maxsize=512)
 def disasm(w):
     op=(w>>28)&0xF; rd=(w>>20)&0xF; rs1=(w>>16)&0xF; rs2=(w>>12)&0xF
     mn = {0:"VADD",1:"VSUB",2:"VMUL",3:"FMAC",4:"RELU",
@@ -61,13 +66,41 @@ def disasm(w):
     return f"{mn}  r{rd}, r{rs1}, r{rs2}"
 
 # ── nvcc ─────────────────────────────────────────────────────────────────────
-def run_nvcc(cu, ptx):
-    cmd = ["nvcc", "-ptx", "-arch=sm_80", str(cu), "-o", str(ptx)]
+def _detect_arch():
+    """Host GPU arch (sm_XY) via nvidia-smi, for nvcc too old for -arch=native."""
+    r = subprocess.run(["nvidia-smi", "--query-gpu=compute_cap",
+                        "--format=csv,noheader"], capture_output=True, text=True)
+    if r.returncode == 0 and r.stdout.strip():
+        cc = r.stdout.strip().splitlines()[0].strip()
+        return "sm_" + cc.replace(".", "")
+    return "sm_80"   # last resort: the previously hard-coded arch
+
+def run_nvcc(cu, ptx, arch="native"):
+    """
+    Compile `cu` and return the PTX text.  On POSIX the PTX is captured
+    straight from nvcc's stdout (no disk round-trip before parsing) and
+    mirrored to `ptx` afterwards so the mtime freshness check still works;
+    elsewhere nvcc writes the file and we read it back.
+    """
+    out = "/dev/stdout" if os.name == "posix" else str(ptx)
+    cmd = ["nvcc", "-ptx", f"-arch={arch}", str(cu), "-o", out]
     print("  $", " ".join(cmd))
     r = subprocess.run(cmd, capture_output=True, text=True)
+    if r.returncode != 0 and arch == "native":
+        # nvcc < 11.6 rejects -arch=native; ask the driver for the arch
+        arch = _detect_arch()
+        print(f"  (nvcc rejected -arch=native; retrying with {arch})")
+        cmd[2] = f"-arch={arch}"
+        r = subprocess.run(cmd, capture_output=True, text=True)
     if r.returncode != 0:
         sys.exit(f"nvcc failed:\n{r.stderr}")
+    if out == str(ptx):
+        text = ptx.read_text()
+    else:
+        text = r.stdout
+        ptx.write_text(text)
     print(f"  -> {ptx}")
+    return text
 
 # ── kernel body extraction ────────────────────────────────────────────────────
 def extract_kernels(ptx_text):
@@ -75,14 +108,20 @@ def extract_kernels(ptx_text):
     for m in re.finditer(r'\.(?:visible\s+)?entry\s+(\w+)\s*\(', ptx_text):
         name  = m.group(1)
         start = ptx_text.index('{', m.start())
-        depth = 0
-        for i in range(start, len(ptx_text)):
-            if ptx_text[i] == '{': depth += 1
-            elif ptx_text[i] == '}':
-                depth -= 1
-                if depth == 0:
-                    kernels[name] = ptx_text[start+1:i]
-                    break
+        # Bounce between the next '{' and '}' with str.find (C-level scans)
+        # instead of visiting every character to track brace depth.
+        depth, i = 1, start + 1
+        while depth:
+            close_b = ptx_text.find('}', i)
+            if close_b == -1:
+                break   # unbalanced braces — drop the entry, as before
+            open_b = ptx_text.find('{', i, close_b)
+            if open_b != -1:
+                depth += 1; i = open_b + 1
+            else:
+                depth -= 1; i = close_b + 1
+        else:
+            kernels[name] = ptx_text[start+1:i-1]
     return kernels
 
 # ── param name extraction ─────────────────────────────────────────────────────
@@ -90,52 +129,114 @@ def get_param_names(ptx_text, kernel_name):
     m = re.search(rf'\.entry\s+{re.escape(kernel_name)}\s*\(([^)]*)\)', ptx_text)
     if not m:
         return []
-    return re.findall(r'\.param\s+\.\w+\s+(\w+)', m.group(1))
+    # Interned so they compare by pointer as param_phys/alias keys.
+    return [sys.intern(p) for p in re.findall(r'\.param\s+\.\w+\s+(\w+)', m.group(1))]
+
+# ── line patterns, compiled once at import ───────────────────────────────────
+# translate() and build_alias() used to rebuild each rf'...' pattern (and
+# hash the re cache) on every PTX line of every pass.
+_R = r'(%\w+)'
+_COMMENT     = re.compile(r'//.*')
+_PAT_LDPARAM = re.compile(r'ld\.param\.\w+\s+(%\w+)\s*,\s*\[(\w+)\]')
+_PAT_CVTA    = re.compile(r'cvta\S*\s+(%\w+)\s*,\s*(%\w+)')
+_PAT_ADD64   = re.compile(r'add\.[su]64\s+(%\w+)\s*,\s*(%\w+)\s*,')
+_PAT_RET     = re.compile(r'ret\b')
+_PAT_LD      = re.compile(rf'ld\.global\.\w+\s+{_R}\s*,\s*\[{_R}\]')
+_PAT_ST      = re.compile(rf'st\.global\.\w+\s+\[{_R}\]\s*,\s*{_R}')
+_PAT_VADD    = re.compile(rf'add\.[su]\d+\s+{_R}\s*,\s*{_R}\s*,\s*{_R}')
+_PAT_VSUB    = re.compile(rf'sub\.[su]\d+\s+{_R}\s*,\s*{_R}\s*,\s*{_R}')
+_PAT_RELU    = re.compile(rf'max\.[su]\d+\s+{_R}\s*,\s*{_R}\s*,\s*0\b')
+_PAT_VMUL    = re.compile(rf'mul\.[a-z0-9.]*bf16[a-z0-9]*\s+{_R}\s*,\s*{_R}\s*,\s*{_R}')
+_PAT_FMA     = re.compile(
+    rf'fma\.[a-z0-9.]*bf16[a-z0-9]*\s+{_R}\s*,\s*{_R}\s*,\s*{_R}\s*,\s*(\S+)')
+
+def _normalize(body):
+    """
+    Comment-strip and trim '{}; \t' from both ends of every line, once per
+    kernel.  build_alias and translate used to redo this per line per pass;
+    both now iterate the same cleaned list.  (The end-trim is the key fix
+    for nvcc's inline asm blocks, which attach braces to the instruction:
+    after the trim each sub-line is a clean instruction.)
+    """
+    return [s for s in (_COMMENT.sub('', l).strip().strip('{}; \t')
+                        for l in body.splitlines()) if s]
+
+
+# Fast path for the skip check: nearly every boilerplate line starts with
+# one of these, and str.startswith with a tuple is a single C call.  Lines
+# missing the fast path still fall through to the full regex, so coverage
+# is unchanged.
+_SKIP_PREFIXES = (
+    '.reg ', '.loc ', '.file ', '.section ', '.visible ', '.entry ',
+    '.param ', '.maxntid ', '.reqntid ',
+    'ld.param.', 'cvta.', 'mov.', 'mul.wide.', 'add.s64 ', 'add.u64 ',
+    'bar.sync', 'setp.', 'bra ', 'bra.', '@',
+)
+
+_SKIP_RE = re.compile(
+    r'^\.(reg|loc|file|section|visible|entry|param|maxntid|reqntid)\b'
+    r'|^ld\.param\b'
+    r'|^cvta\b'
+    r'|^mov\.u32\b'
+    r'|^mul\.wide\b'
+    r'|^add\.[su]64\b'
+    r'|^mov\.b64\b'
+    r'|^mov\.b16\b'
+    r'|^mov\.\w+\b'
+    r'|^@'
+    r'|^bar\.sync\b'
+    r'|^setp\b'
+    r'|^bra\b'
+)
 
 # ── full address-chain alias map ──────────────────────────────────────────────
-def build_alias(body):
+def build_alias(lines):
     """
     Propagate: ld.param -> cvta -> add.s64
-    Returns dict: any_ptx_reg -> root_param_name
+    Takes the _normalize()d line list; returns dict:
+    any_ptx_reg -> root_param_name
+
+    Single pass: ld.param seeds parent[reg] = param_name, cvta/add.s64
+    record one edge each, then union-find with path compression resolves
+    every chain — instead of re-scanning and re-matching the whole body
+    under a while-changed loop until nothing moves.  Registers whose chain
+    does not bottom out at a param resolve to a plain register name, which
+    translate() ignores exactly as it ignores an absent entry.
     """
-    alias = {}
-    for raw in body.splitlines():
-        line = re.sub(r'//.*', '', raw).strip().strip('{}; \t')
-        m = re.match(r'ld\.param\.\w+\s+(%\w+)\s*,\s*\[(\w+)\]', line)
-        if m:
-            alias[m[1]] = m[2]
-
-    def resolve(r, visited=None):
-        if visited is None: visited = set()
-        while r in alias and r not in visited:
-            visited.add(r); r = alias[r]
+    parent = {}
+
+    def find(r):
+        path = []
+        while r in parent and parent[r] != r and r not in path:
+            path.append(r)
+            r = parent[r]
+        for p in path:   # path compression
+            parent[p] = r
         return r
 
-    changed = True
-    while changed:
-        changed = False
-        for raw in body.splitlines():
-            line = re.sub(r'//.*', '', raw).strip().strip('{}; \t')
-            # cvta.to.global dst, src
-            m = re.match(r'cvta\S*\s+(%\w+)\s*,\s*(%\w+)', line)
-            if m and m[2] in alias:
-                new = resolve(m[2])
-                if alias.get(m[1]) != new:
-                    alias[m[1]] = new; changed = True
-                continue
-            # add.s64 dst, src, offset  (only propagate if src is param-derived)
-            m = re.match(r'add\.[su]64\s+(%\w+)\s*,\s*(%\w+)\s*,', line)
-            if m and m[2] in alias:
-                new = resolve(m[2])
-                if alias.get(m[1]) != new:
-                    alias[m[1]] = new; changed = True
+    edges = []
+    for line in lines:
+        m = _PAT_LDPARAM.match(line)
+        if m:
+            parent[sys.intern(m[1])] = sys.intern(m[2])
+            continue
+        # cvta.to.global dst, src   /   add.s64 dst, src, offset
+        m = _PAT_CVTA.match(line) or _PAT_ADD64.match(line)
+        if m:
+            edges.append((sys.intern(m[1]), sys.intern(m[2])))
+
+    for dst, src in edges:
+        root = find(src)
+        if root != dst:
+            parent[dst] = root
 
-    return {k: resolve(k) for k in alias}
+    return {k: find(k) for k in parent}
 
 # ── translate one kernel ──────────────────────────────────────────────────────
 def translate(body, kernel_name, ptx_text):
     params = get_param_names(ptx_text, kernel_name)
-    alias  = build_alias(body)
+    lines  = _normalize(body)
+    alias  = build_alias(lines)
     n      = len(params)
 
     # Physical register assignment by CUDA argument order:
@@ -172,124 +273,89 @@ def translate(body, kernel_name, ptx_text):
     rmap = {}
 
     def phys(ptx_reg):
+        # Interned names make every rmap/alias/param_phys probe a pointer
+        # comparison — regex .group() builds a fresh string per reference.
+        ptx_reg = sys.intern(ptx_reg)
+        # Fast path: a register is assigned once but referenced many times,
+        # so a prior assignment in rmap is the common case — one probe and
+        # out, no alias resolve.
+        r = rmap.get(ptx_reg)
+        if r is not None:
+            return r
         root = alias.get(ptx_reg, ptx_reg)
         if root in param_phys:
-            p = param_phys[root]
-            rmap[ptx_reg] = p
-            return p
-        if ptx_reg not in rmap:
-            while nxt[0] in used: nxt[0] += 1
-            rmap[ptx_reg] = nxt[0]
-            used.add(nxt[0])
-            nxt[0] += 1
-        return rmap[ptx_reg]
-
-    insns   = []
-    emitted = set()
-
-    def emit(op, rd, rs1, rs2=None):
-        key = (op, rd, rs1, rs2)
-        if key in emitted: return
-        emitted.add(key)
-        insns.append({"op":op, "rd":rd, "rs1":rs1,
-                      "rs2": rs2 if rs2 is not None else 0})
-
-    R = r'(%\w+)'
-
-    SKIP = re.compile(
-        r'^\.(reg|loc|file|section|visible|entry|param|maxntid|reqntid)\b'
-        r'|^ld\.param\b'
-        r'|^cvta\b'
-        r'|^mov\.u32\b'
-        r'|^mul\.wide\b'
-        r'|^add\.[su]64\b'
-        r'|^mov\.b64\b'
-        r'|^mov\.b16\b'
-        r'|^mov\.\w+\b'
-        r'|^@'
-        r'|^bar\.sync\b'
-        r'|^setp\b'
-        r'|^bra\b'
-    )
-
-    for raw in body.splitlines():
-        # ── strip braces and semicolons from both ends ────────────────────
-        # This is the key fix for nvcc's inline asm blocks, which produce:
-        #   {.reg .b16 c;\n  fma.rn.bf16 %rs1,%rs2,%rs3,c;}
-        # After strip('{}; \t') each sub-line becomes a clean instruction.
-        line = re.sub(r'//.*', '', raw).strip().strip('{}; \t')
-        if not line or SKIP.search(line):
-            continue
-
-        # HALT
-        if re.match(r'ret\b', line):
-            insns.append({"op":"HALT","rd":0,"rs1":0,"rs2":0})
-            continue
-
-        # LD
-        m = re.match(rf'ld\.global\.\w+\s+{R}\s*,\s*\[{R}\]', line)
-        if m:
-            insns.append({"op":"LD", "rd":phys(m[1]), "rs1":phys(m[2]), "rs2":0})
-            continue
-
-        # ST
-        m = re.match(rf'st\.global\.\w+\s+\[{R}\]\s*,\s*{R}', line)
-        if m:
-            insns.append({"op":"ST", "rd":0, "rs1":phys(m[1]), "rs2":phys(m[2])})
-            continue
-
-        # VADD (add.s16 / add.u16)
-        m = re.match(rf'add\.[su]\d+\s+{R}\s*,\s*{R}\s*,\s*{R}', line)
-        if m:
-            emit("VADD", phys(m[1]), phys(m[2]), phys(m[3]))
-            continue
-
-        # VSUB
-        m = re.match(rf'sub\.[su]\d+\s+{R}\s*,\s*{R}\s*,\s*{R}', line)
-        if m:
-            emit("VSUB", phys(m[1]), phys(m[2]), phys(m[3]))
-            continue
+            rmap[ptx_reg] = r = param_phys[root]
+            return r
+        while nxt[0] in used: nxt[0] += 1
+        rmap[ptx_reg] = r = nxt[0]
+        used.add(r)
+        nxt[0] += 1
+        return r
 
-        # RELU (max with literal 0)
-        m = re.match(rf'max\.[su]\d+\s+{R}\s*,\s*{R}\s*,\s*0\b', line)
-        if m:
-            emit("RELU", phys(m[1]), phys(m[2]))
-            continue
+    words = []
+    seen  = {}
 
-        # VMUL (mul.rn.bf16 / mul.rn.bf16x2)
-        m = re.match(rf'mul\.[a-z0-9.]*bf16[a-z0-9]*\s+{R}\s*,\s*{R}\s*,\s*{R}', line)
-        if m:
-            emit("VMUL", phys(m[1]), phys(m[2]), phys(m[3]))
-            continue
+    def emit(op, rd, rs1, rs2=0):
+        # Encode immediately and dedup on the 32-bit word itself — the word
+        # uniquely determines (op, rd, rs1, rs2), so this replaces the
+        # tuple-keyed set plus a dict allocation per instruction, and the
+        # separate assemble() pass.
+        w = encode(op, rd, rs1, rs2)
+        if w not in seen:
+            seen[w] = None
+            words.append(w)
 
-        # VMUL or FMAC from fma instruction
+    def handle_fma(m):
         # fma.rn.bf16  rd, rs1, rs2, acc_or_literal
         # If 4th operand is a % register -> FMAC
         # If 4th operand is a literal (like 'c' = -0.0) -> VMUL
-        m = re.match(
-            rf'fma\.[a-z0-9.]*bf16[a-z0-9]*\s+{R}\s*,\s*{R}\s*,\s*{R}\s*,\s*(\S+)',
-            line)
-        if m:
-            acc = m.group(4).strip(';}')
-            if acc.startswith('%'):
-                emit("FMAC", phys(m[1]), phys(m[2]), phys(m[3]))
-            else:
-                # literal accumulator (nvcc's __hmul emits fma with c=-0)
-                emit("VMUL", phys(m[1]), phys(m[2]), phys(m[3]))
+        acc = m.group(4).strip(';}')
+        if acc.startswith('%'):
+            emit("FMAC", phys(m[1]), phys(m[2]), phys(m[3]))
+        else:
+            # literal accumulator (nvcc's __hmul emits fma with c=-0)
+            emit("VMUL", phys(m[1]), phys(m[2]), phys(m[3]))
+
+    # The mnemonic stem picks the one pattern that can match: a dict probe
+    # plus one targeted regex per line instead of a cascade through all
+    # eight patterns.  ld.param/add.s64 etc. never reach the dispatch —
+    # _SKIP_RE drops them first.
+    dispatch = {
+        'ret': (_PAT_RET,  lambda m: words.append(encode("HALT"))),
+        'ld':  (_PAT_LD,   lambda m: words.append(
+                    encode("LD", phys(m[1]), phys(m[2])))),
+        'st':  (_PAT_ST,   lambda m: words.append(
+                    encode("ST", 0, phys(m[1]), phys(m[2])))),
+        'add': (_PAT_VADD, lambda m: emit("VADD", phys(m[1]), phys(m[2]), phys(m[3]))),
+        'sub': (_PAT_VSUB, lambda m: emit("VSUB", phys(m[1]), phys(m[2]), phys(m[3]))),
+        'max': (_PAT_RELU, lambda m: emit("RELU", phys(m[1]), phys(m[2]))),
+        'mul': (_PAT_VMUL, lambda m: emit("VMUL", phys(m[1]), phys(m[2]), phys(m[3]))),
+        'fma': (_PAT_FMA,  handle_fma),
+    }
+
+    for line in lines:
+        if line.startswith(_SKIP_PREFIXES) or _SKIP_RE.search(line):
             continue
 
+        entry = dispatch.get(line.partition('.')[0].partition(' ')[0])
+        if entry:
+            m = entry[0].match(line)
+            if m:
+                entry[1](m)
+                continue
+
         # Warn on any compute-looking line that didn't match
         first = line.split()[0] if line.split() else ''
         if any(x in first for x in ('mul.','fma.','add.','sub.','max.')):
             print(f"  WARNING: unmatched compute line: {line!r}")
 
     print(f"  params: { {p: param_phys[p] for p in params if p in param_phys} }")
-    return insns
+    return words
 
-# ── assemble ─────────────────────────────────────────────────────────────────
-def assemble(insns):
-    return [encode(i["op"], i.get("rd",0), i.get("rs1",0), i.get("rs2",0))
-            for i in insns]
+def _translate_one(job):
+    """Worker for the per-kernel process pool: job = (body, name, ptx_text)."""
+    body, name, ptx_text = job
+    return name, translate(body, name, ptx_text)
 
 # ── main ─────────────────────────────────────────────────────────────────────
 def main():
@@ -297,16 +363,28 @@ def main():
     ap.add_argument("cu")
     ap.add_argument("--kernel")
     ap.add_argument("--list", action="store_true")
+    ap.add_argument("--force", action="store_true",
+                    help="rerun nvcc even if the .ptx is up to date")
+    ap.add_argument("--arch", default="native",
+                    help="nvcc -arch value (default: native, i.e. the host GPU)")
+    ap.add_argument("--binary", action="store_true",
+                    help="write the .mem as raw big-endian words (for a "
+                         "$fread loader) instead of $readmemh hex text")
     ap.add_argument("-o", default="gpu_program")
     args = ap.parse_args()
 
     cu  = Path(args.cu)
     ptx = cu.with_suffix(".ptx")
 
+    # Skip nvcc Make-style when the .ptx is already newer than the .cu —
+    # nvcc startup dominates the whole script otherwise.
     print(f"\n[1] nvcc: {cu.name} -> {ptx.name}")
-    run_nvcc(cu, ptx)
+    if not args.force and ptx.exists() and ptx.stat().st_mtime >= cu.stat().st_mtime:
+        print("  (ptx up to date, skipping nvcc — use --force to rerun)")
+        text = ptx.read_text()
+    else:
+        text = run_nvcc(cu, ptx, args.arch)
 
-    text    = ptx.read_text()
     kernels = extract_kernels(text)
     print(f"\n[2] Kernels found: {', '.join(kernels)}")
 
@@ -318,46 +396,79 @@ def main():
     if args.kernel and args.kernel not in kernels:
         sys.exit(f"Kernel {args.kernel!r} not found. Available: {list(kernels)}")
 
-    print(f"\n[3] Translating {len(to_compile)} kernel(s):")
-    all_words, sections, addr = [], [], 0
-
-    for name in to_compile:
-        print(f"\n  [{name}]  @ addr {addr}")
-        insns = translate(kernels[name], name, text)
-        words = assemble(insns)
-        print(f"  {len(words)} instructions  (addr {addr}-{addr+len(words)-1})")
-        all_words.extend(words)
-        sections.append((name, len(words)))
-        addr += len(words)
+    # Translation cache: the same PTX (and kernel selection) always yields
+    # the same words, so reruns after e.g. a Verilog edit re-emit from a
+    # pickle keyed on the PTX hash instead of re-translating.
+    key = hashlib.blake2b((repr(args.kernel) + "\0" + text).encode(),
+                          digest_size=16).hexdigest()
+    cache_path = Path(".compile_gpu_cache") / f"{key}.pkl"
 
-    if addr > 256:
-        sys.exit(f"Program too large: {addr} words > 256")
+    if cache_path.exists():
+        all_words, sections = pickle.loads(cache_path.read_bytes())
+        print(f"\n[3] Translation cache hit: {cache_path}")
+    else:
+        print(f"\n[3] Translating {len(to_compile)} kernel(s):")
+        jobs = [(kernels[n], n, text) for n in to_compile]
+        if len(jobs) > 1:
+            # Kernels translate independently and are CPU-bound on regex
+            # work — fan out across cores.  (Worker prints may interleave;
+            # the concatenation order below stays deterministic.)
+            with ProcessPoolExecutor() as ex:
+                results = list(ex.map(_translate_one, jobs))
+        else:
+            results = [_translate_one(jobs[0])]
+
+        all_words, sections, addr = [], [], 0
+        for name, words in results:
+            print(f"\n  [{name}]  @ addr {addr}")
+            print(f"  {len(words)} instructions  (addr {addr}-{addr+len(words)-1})")
+            all_words.extend(words)
+            sections.append((name, len(words)))
+            addr += len(words)
+
+        cache_path.parent.mkdir(exist_ok=True)
+        cache_path.write_bytes(pickle.dumps((all_words, sections)))
+
+    if len(all_words) > 256:
+        sys.exit(f"Program too large: {len(all_words)} words > 256")
 
     mem_path  = args.o + ".mem"
     lst_path  = args.o + ".lst"
-    halt_word = encode("HALT")
 
-    with open(mem_path, "w") as f:
-        for w in all_words:          f.write(f"{w:08X}\n")
-        for _ in range(len(all_words), 256): f.write(f"{halt_word:08X}\n")
+    # Each file body is built as one string and written in a single call —
+    # not one format + write per line.  Disassembly is computed once and
+    # reused by the terminal preview below.
+    padded = all_words + [_HALT_WORD] * (256 - len(all_words))
+    if args.binary:
+        # Raw big-endian words, no text formatting at all.  The testbench
+        # must then load imem with $fread instead of $readmemh.
+        a = array.array('I', padded)
+        if sys.byteorder == 'little':
+            a.byteswap()
+        with open(mem_path, 'wb') as f:
+            a.tofile(f)
+    else:
+        # '%' hex formatting runs in C; one join, one write.
+        Path(mem_path).write_text("".join("%08X\n" % w for w in padded))
+
+    # Section start addresses computed once with accumulate — the listing
+    # and preview loops index from them instead of hand-stepping a counter.
+    ds      = [disasm(w) for w in all_words]
+    offsets = [0, *itertools.accumulate(c for _, c in sections)]
 
-    with open(lst_path, "w") as f:
-        f.write(f"// {cu.name} -> {mem_path}\n// addr  word      disassembly\n")
-        idx = 0
-        for name, count in sections:
-            f.write(f"\n// -- {name} --\n")
-            for w in all_words[idx:idx+count]:
-                f.write(f"[{idx:03d}]  {w:08X}  {disasm(w)}\n")
-                idx += 1
+    lst = [f"// {cu.name} -> {mem_path}", "// addr  word      disassembly"]
+    for (name, count), off in zip(sections, offsets):
+        lst.append(f"\n// -- {name} --")
+        lst.extend(f"[{off+i:03d}]  {w:08X}  {ds[off+i]}"
+                   for i, w in enumerate(all_words[off:off+count]))
+    Path(lst_path).write_text("\n".join(lst) + "\n")
 
     print(f"\n[4] Output ({len(all_words)} instructions)")
     print(f"  {mem_path}\n  {lst_path}\n")
-    idx = 0
-    for name, count in sections:
+    for (name, count), off in zip(sections, offsets):
         print(f"  // {name}")
-        for w in all_words[idx:idx+count]:
-            print(f"  [{idx:03d}]  {w:08X}  {disasm(w)}")
-            idx += 1
+        for i, w in enumerate(all_words[off:off+count]):
+            print(f"  [{off+i:03d}]  {w:08X}  {ds[off+i]}")
         print()
 
 if __name__ == "__main__":
@@ -14,16 +14,44 @@ def extract_kernels(ptx):
     for m in re.finditer(r'\.(?:visible\s+)?entry\s+(\w+)\s*\(', ptx):
         name  = m.group(1)
         start = ptx.index('{', m.start())
-        depth = 0
-        for i in range(start, len(ptx)):
-            if ptx[i] == '{': depth += 1
-            elif ptx[i] == '}':
-                depth -= 1
-                if depth == 0:
-                    kernels[name] = ptx[start+1:i]
-                    break
+        # Bounce between the next '{' and '}' with str.find (C-level scans)
+        # instead of visiting every character to track brace depth.
+        depth, i = 1, start + 1
+        while depth:
+            close_b = ptx.find('}', i)
+            if close_b == -1:
+                break   # unbalanced braces — drop the entry, as before
+            open_b = ptx.find('{', i, close_b)
+            if open_b != -1:
+                depth += 1; i = open_b + 1
+            else:
+                depth -= 1; i = close_b + 1
+        else:
+            kernels[name] = ptx[start+1:i-1]
     return kernels
 
+# All seven instruction patterns fused into one alternation so each line is
+# scanned once.  The empty named group at the end of each branch tags which
+# one matched (m.lastgroup); LABELS maps the tag back to a display name.
+LABELS = {
+    "add": "add.[su]16",
+    "sub": "sub.[su]16",
+    "max": "max.[su]16",
+    "mul": "mul.rn.bf16(x2)?",
+    "fma": "fma.rn.bf16(x2)?",
+    "ld":  "ld.global",
+    "st":  "st.global",
+}
+MASTER = re.compile(
+    r'add\.[su]16\s+(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)(?P<add>)'
+    r'|sub\.[su]16\s+(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)(?P<sub>)'
+    r'|max\.[su]16\s+(%\w+)\s*,\s*(%\w+)\s*,\s*0(?P<max>)'
+    r'|mul\.rn\.bf16x?2?\s+(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)(?P<mul>)'
+    r'|fma\.rn\.bf16x?2?\s+(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)(?P<fma>)'
+    r'|ld\.global\.\w+\s+(%\w+)\s*,\s*\[(%\w+)\](?P<ld>)'
+    r'|st\.global\.\w+\s+\[(%\w+)\]\s*,\s*(%\w+)(?P<st>)'
+)
+
 if len(sys.argv) < 2:
     print("Usage: python test_real_ptx.py kernel.ptx")
     sys.exit(1)
@@ -60,28 +88,18 @@ for name, body in kernels.items():
 
     # Show which compute lines match/don't match
     print(f"\n  --- Pattern matching (Pass 2) ---")
-    patterns = {
-        "add.[su]16":        r'add\.[su]16\s+(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)',
-        "sub.[su]16":        r'sub\.[su]16\s+(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)',
-        "max.[su]16":        r'max\.[su]16\s+(%\w+)\s*,\s*(%\w+)\s*,\s*0',
-        "mul.rn.bf16(x2)?":  r'mul\.rn\.bf16x?2?\s+(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)',
-        "fma.rn.bf16(x2)?":  r'fma\.rn\.bf16x?2?\s+(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)\s*,\s*(%\w+)',
-        "ld.global":         r'ld\.global\.\w+\s+(%\w+)\s*,\s*\[(%\w+)\]',
-        "st.global":         r'st\.global\.\w+\s+\[(%\w+)\]\s*,\s*(%\w+)',
-    }
     for raw in body.splitlines():
         line = re.sub(r'//.*', '', raw).strip().rstrip(';').strip()
         if not line: continue
-        for label, pat in patterns.items():
-            if re.match(pat, line):
-                m = re.match(pat, line)
-                regs = [s16_to_u64.get(g, g) for g in m.groups()]
-                print(f"    MATCH [{label}]: {line}")
-                print(f"           -> resolved regs: {regs}")
-                break
+        m = MASTER.match(line)
+        if m:
+            regs = [s16_to_u64.get(g, g) for g in m.groups()
+                    if g is not None and g.startswith('%')]
+            print(f"    MATCH [{LABELS[m.lastgroup]}]: {line}")
+            print(f"           -> resolved regs: {regs}")
         else:
             # didn't match any pattern - show lines that look like compute ops
             if any(x in line for x in ['mul.', 'fma.', 'add.', 'sub.', 'max.']) \
                and 'param' not in line and 'wide' not in line \
                and 'lo' not in line and 'u64' not in line:
-                print(f"    NO MATCH (compute-looking): {line}")
\ No newline at end of file
+                print(f"    NO MATCH (compute-looking): {line}")